@@ -2,23 +2,30 @@
 """
 Chat API endpoints
 """
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 import logging
 
-from backend.app.models.chat import ChatRequest, ChatResponse
+from backend.app.models.chat import ChatRequest, ChatResponse, SourceChunk
+from backend.app.services.admission import QueueFull, RateLimitExceeded, admission_controller
 from backend.app.services.chatbot_service import chatbot_service
+from backend.app.services.index_router import IndexNotFound
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 @router.post("/", response_model=ChatResponse, status_code=status.HTTP_200_OK)
-async def chat(request: ChatRequest) -> ChatResponse:
+async def chat(request: ChatRequest, http_request: Request) -> ChatResponse:
     """
     Skicka en fråga till chatboten och få svar
 
     - **question**: Din fråga om Husqvarna motorsågar
     - **session_id**: (Valfri) Session ID för att spåra konversation
+    - **index**: (Valfri) Vilket index (produktlinje) som ska sökas
+
+    Returnerar 429 om klienten överskrider sin rate limit och 503 om
+    servern är överbelastad, båda med en Retry-After header.
     """
     try:
         if not chatbot_service.is_ready():
@@ -27,19 +34,53 @@ async def chat(request: ChatRequest) -> ChatResponse:
                 detail="Chatbot är inte redo. Försök igen senare."
             )
 
-        # Få svar från chatbot
-        answer = chatbot_service.ask_question(request.question)
+        # Okänt index avvisas innan det kostar rate limit-tokens eller köplats
+        chatbot_service.check_index(request.index)
+
+        # Rate limit per IP (alltid) och per session. Bakom nginx är
+        # client.host den riktiga klienten tack vare X-Forwarded-For och
+        # uvicorns --proxy-headers.
+        client_host = http_request.client.host if http_request.client else "unknown"
+        admission_controller.check_rate_limit(client_host, request.session_id)
+
+        # Få svar från chatbot. Körs i en tråd så att event loopen kan
+        # hantera kön medan embedding och Gemini-anrop pågår.
+        async with admission_controller.generation_slot():
+            answer, sources = await run_in_threadpool(
+                chatbot_service.ask_question, request.question, request.index
+            )
 
         # Skapa response
         response = ChatResponse(
             answer=answer,
             question=request.question,
-            session_id=request.session_id
+            session_id=request.session_id,
+            sources=[SourceChunk(**source) for source in sources]
         )
 
         logger.info(f"Svar skapat för fråga: '{request.question[:50]}...'")
         return response
 
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except QueueFull as e:
+        logger.warning(f"Kön är full ({admission_controller.waiting} väntar)")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except IndexNotFound as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Fel i chat endpoint: {e}")
         raise HTTPException(
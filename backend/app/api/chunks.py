@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Chunk API endpoint - hämta källtext för "visa källa"
+"""
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, status
+
+from backend.app.core.config import settings
+from backend.app.models.chat import ChunkResponse
+from backend.app.services.chatbot_service import chatbot_service
+from backend.app.services.index_router import IndexNotFound, IndexNotLoaded
+
+router = APIRouter(prefix="/chunks", tags=["chunks"])
+
+@router.get("/{chunk_id}", response_model=ChunkResponse)
+async def get_chunk(chunk_id: str, index: Optional[str] = None) -> ChunkResponse:
+    """
+    Hämta en chunk från bruksanvisningarna via dess id
+
+    - **chunk_id**: Id från `sources` i ett chat-svar
+    - **index**: (Valfri) Index från `sources`, standardindexet om tomt
+
+    Servar bara index som redan ligger i minnet (409 annars), så att
+    endpointen aldrig laddar index från disk eller orsakar LRU-evictions.
+    """
+    if not chatbot_service.is_ready():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Chatbot är inte redo. Försök igen senare."
+        )
+
+    index = index or settings.DEFAULT_INDEX
+    try:
+        doc = chatbot_service.get_chunk(chunk_id, index)
+    except IndexNotFound as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except IndexNotLoaded as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chunk {chunk_id} finns inte"
+        )
+
+    return ChunkResponse(
+        chunk_id=chunk_id,
+        index=index,
+        content=doc.page_content,
+        model=doc.metadata.get("model"),
+        section=doc.metadata.get("section"),
+        page_start=doc.metadata.get("page_start"),
+        page_end=doc.metadata.get("page_end")
+    )
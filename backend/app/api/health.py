@@ -2,22 +2,34 @@
 """
 Health check API endpoint
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Response, status
 from backend.app.models.chat import HealthResponse
+from backend.app.services.admission import admission_controller
 from backend.app.services.chatbot_service import chatbot_service
 from backend.app.core.config import settings
 
 router = APIRouter(prefix="/health", tags=["health"])
 
 @router.get("/", response_model=HealthResponse)
-async def health_check() -> HealthResponse:
+async def health_check(response: Response) -> HealthResponse:
     """
     Kontrollera om API:et är igång och redo
 
-    Returnerar status, version och om AI-modellen är laddad
+    Returnerar status, version, om AI-modellen är laddad och aktuellt
+    kö-djup. När väntekön är full svarar endpointen 503 med status
+    "saturated", så att lastbalanserare (som bara tittar på statuskoden)
+    skickar trafik till andra instanser.
     """
+    saturated = admission_controller.is_saturated()
+    if saturated:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
     return HealthResponse(
-        status="ok",
+        status="saturated" if saturated else "ok",
         version=settings.APP_VERSION,
-        model_loaded=chatbot_service.is_ready()
+        model_loaded=chatbot_service.is_ready(),
+        queue_depth=admission_controller.waiting,
+        active_generations=admission_controller.active,
+        max_queue_size=settings.MAX_QUEUE_SIZE,
+        loaded_indexes=chatbot_service.indexes.loaded() if chatbot_service.indexes else []
     )
@@ -28,6 +28,16 @@ class Settings(BaseSettings):
     NUM_DOCUMENTS: int = 8  # Antal dokument att hämta från FAISS
     MODEL_NAME: str = "google/flan-t5-base"
     EMBEDDING_MODEL: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+    PROMPT_VERSION: str = "v1"  # Version av prompt-mallen i services/prompt_template.py
+
+    # Admission control (se services/admission.py)
+    RATE_LIMIT_PER_MINUTE: int = 10  # Frågor per minut per session
+    RATE_LIMIT_BURST: int = 5  # Antal frågor som får skickas direkt i följd per session
+    RATE_LIMIT_IP_PER_MINUTE: int = 20  # Frågor per minut per IP, gäller alltid (högre för NAT)
+    RATE_LIMIT_IP_BURST: int = 10  # Antal frågor i följd per IP
+    MAX_CONCURRENT_GENERATIONS: int = 4  # Samtidiga embedding- och Gemini-anrop
+    MAX_QUEUE_SIZE: int = 16  # Max väntande requests innan 503
+    QUEUE_TIMEOUT: float = 30.0  # Sekunder en request får vänta i kön
 
     # Paths (relativa till projektrot)
     BASE_DIR: Path = Path(__file__).resolve().parent.parent.parent.parent
@@ -35,6 +45,21 @@ class Settings(BaseSettings):
     FAISS_INDEX_PATH: str = str(Path("/code/faiss_index") if Path("/code").exists() else BASE_DIR / "faiss_index")
     DATA_PATH: str = str(Path("/code/data") if Path("/code").exists() else BASE_DIR / "data")
 
+    # Flera index (t.ex. en per produktlinje): namn -> katalog relativt
+    # FAISS_INDEX_PATH, så att samma .env fungerar både i Docker och lokalt.
+    # Tomt betyder att bara FAISS_INDEX_PATH används under namnet DEFAULT_INDEX.
+    # Sätts i .env som JSON, t.ex. FAISS_INDEXES={"sagar": "sagar"}
+    FAISS_INDEXES: dict = {}
+    DEFAULT_INDEX: str = "default"
+    MAX_LOADED_INDEXES: int = 2  # Antal index som hålls i minnet samtidigt (LRU)
+
+    def index_paths(self) -> dict:
+        """Alla konfigurerade index med absoluta sökvägar, inklusive standardindexet"""
+        root = Path(self.FAISS_INDEX_PATH)
+        paths = {name: str(root / path) for name, path in self.FAISS_INDEXES.items()}
+        paths.setdefault(self.DEFAULT_INDEX, self.FAISS_INDEX_PATH)
+        return paths
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -9,7 +9,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.app.core.config import settings
-from backend.app.api import chat, health
+from backend.app.api import chat, chunks, health
 from backend.app.services.chatbot_service import chatbot_service
 
 # Konfigurera logging
@@ -57,6 +57,7 @@ app.add_middleware(
 # Inkludera API routes
 app.include_router(health.router, prefix=settings.API_V1_PREFIX)
 app.include_router(chat.router, prefix=settings.API_V1_PREFIX)
+app.include_router(chunks.router, prefix=settings.API_V1_PREFIX)
 
 @app.get("/")
 async def root():
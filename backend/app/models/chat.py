@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Pydantic models för chat API
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ChatRequest(BaseModel):
+    """Request för att ställa en fråga"""
+    question: str = Field(..., min_length=1, description="Användarens fråga")
+    session_id: Optional[str] = Field(None, description="Session ID för att spåra konversation")
+    index: Optional[str] = Field(None, description="Vilket index (produktlinje) som ska sökas, standard om tomt")
+
+
+class SourceChunk(BaseModel):
+    """En chunk från bruksanvisningarna som användes som kontext för svaret"""
+    chunk_id: str = Field(..., description="ID för att hämta chunken via /chunks/{chunk_id}")
+    index: Optional[str] = Field(None, description="Index som chunken kommer från")
+    model: Optional[str] = Field(None, description="Vilken såg chunken gäller")
+    page_start: Optional[int] = Field(None, description="Första sidan i bruksanvisningen")
+    page_end: Optional[int] = Field(None, description="Sista sidan i bruksanvisningen")
+    score: Optional[float] = Field(None, description="FAISS-avstånd (lägre är bättre), saknas för nyckelordsträffar")
+
+
+class ChatResponse(BaseModel):
+    """Svar från chatboten"""
+    answer: str
+    question: str
+    session_id: Optional[str] = None
+    sources: List[SourceChunk] = Field(default_factory=list)
+    timestamp: datetime = Field(default_factory=datetime.now)
+
+
+class ChunkResponse(BaseModel):
+    """En enskild chunk för "visa källa" i frontend"""
+    chunk_id: str
+    index: str
+    content: str
+    model: Optional[str] = None
+    section: Optional[str] = None
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+
+
+class HealthResponse(BaseModel):
+    """Status för API:et"""
+    status: str
+    version: str
+    model_loaded: bool
+    queue_depth: int = Field(0, description="Antal requests som väntar på en generationsplats")
+    active_generations: int = Field(0, description="Antal generationer som pågår just nu")
+    max_queue_size: int = Field(0, description="Max antal väntande requests innan 503")
+    loaded_indexes: List[str] = Field(default_factory=list, description="Index som ligger i minnet")
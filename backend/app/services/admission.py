@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Admission control - rate limiting och köhantering för chat-requests
+
+- Token buckets per klient-IP, och dessutom per session_id när den finns,
+  begränsar hur ofta en klient får ställa frågor. session_id väljs av
+  klienten och kan bytas fritt, så IP-gränsen gäller alltid.
+- En global semafor begränsar antal samtidiga generationer.
+- En begränsad väntekö avvisar nya requests när den är full, så att
+  instansen inte samlar på sig arbete den inte hinner med.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """Klienten har slut på tokens i sin bucket"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Rate limit överskriden, försök igen om {retry_after} s")
+        self.retry_after = retry_after
+
+
+class QueueFull(Exception):
+    """Väntekön är full eller väntetiden gick ut"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Servern är överbelastad, försök igen om {retry_after} s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Enkel token bucket som fylls på kontinuerligt"""
+
+    def __init__(self, capacity: int, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def consume(self) -> float:
+        """
+        Förbruka en token
+
+        Returns:
+            0 om en token fanns, annars antal sekunder tills nästa token
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.refill_per_second
+
+
+class AdmissionController:
+    """
+    Håller reda på rate limits, samtidiga generationer och kö-djup
+    """
+
+    # Max antal klienter att hålla buckets för (äldst används kastas först)
+    MAX_TRACKED_CLIENTS = 10000
+
+    def __init__(self):
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.active = 0
+        # Glidande medelvärde av generationstid, används för Retry-After
+        self._avg_generation_seconds = 5.0
+
+    def _consume(self, client_key: str, capacity: int, per_minute: int) -> None:
+        """Förbruka en token ur klientens bucket, kasta RateLimitExceeded om den är tom"""
+        bucket = self._buckets.get(client_key)
+        if bucket is None:
+            bucket = TokenBucket(capacity=capacity, refill_per_second=per_minute / 60)
+            self._buckets[client_key] = bucket
+            if len(self._buckets) > self.MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_key)
+
+        wait = bucket.consume()
+        if wait > 0:
+            logger.warning(f"Rate limit för {client_key}, nästa token om {wait:.1f} s")
+            raise RateLimitExceeded(math.ceil(wait))
+
+    def check_rate_limit(self, client_ip: str, session_id: Optional[str] = None) -> None:
+        """
+        Kasta RateLimitExceeded om klienten har slut på tokens
+
+        IP-bucketen gäller alltid. Session-bucketen gäller dessutom när
+        session_id finns, men ersätter aldrig IP-gränsen.
+        """
+        self._consume(f"ip:{client_ip}", settings.RATE_LIMIT_IP_BURST, settings.RATE_LIMIT_IP_PER_MINUTE)
+        if session_id:
+            self._consume(f"session:{session_id}", settings.RATE_LIMIT_BURST, settings.RATE_LIMIT_PER_MINUTE)
+
+    def is_saturated(self) -> bool:
+        """Alla generationsplatser är upptagna och väntekön är full"""
+        capacity = settings.MAX_CONCURRENT_GENERATIONS + settings.MAX_QUEUE_SIZE
+        return self.active + self.waiting >= capacity
+
+    def _estimate_retry_after(self) -> int:
+        """Uppskatta när en plats i kön blir ledig"""
+        slots = max(settings.MAX_CONCURRENT_GENERATIONS, 1)
+        return max(1, math.ceil(self._avg_generation_seconds * (self.waiting + 1) / slots))
+
+    @asynccontextmanager
+    async def generation_slot(self):
+        """
+        Vänta på en ledig generationsplats
+
+        Kastar QueueFull direkt om kön är full, eller om platsen inte blir
+        ledig inom QUEUE_TIMEOUT sekunder.
+        """
+        # Skapas lazy så att semaforen hör till den körande event loopen
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_GENERATIONS)
+
+        if self.is_saturated():
+            raise QueueFull(self._estimate_retry_after())
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=settings.QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise QueueFull(self._estimate_retry_after())
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._avg_generation_seconds = 0.8 * self._avg_generation_seconds + 0.2 * elapsed
+            self.active -= 1
+            self._semaphore.release()
+
+
+# Singleton instance
+admission_controller = AdmissionController()
@@ -6,7 +6,7 @@ import sys
 import io
 import logging
 import os
-from typing import Optional
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
 
 # Ladda .env filen
@@ -16,11 +16,12 @@ load_dotenv()
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 from langchain_core.documents import Document
-from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
 import google.generativeai as genai
 
 from backend.app.core.config import settings
+from backend.app.services.index_router import IndexRouter
+from backend.app.services.prompt_template import PromptTemplate
 
 logger = logging.getLogger(__name__)
 
@@ -31,8 +32,9 @@ class ChatbotService:
 
     def __init__(self):
         self.embeddings: Optional[HuggingFaceEmbeddings] = None
-        self.vectorstore: Optional[FAISS] = None
+        self.indexes: Optional[IndexRouter] = None
         self.gemini_model = None
+        self.prompt: Optional[PromptTemplate] = None
         self._model_loaded = False
 
     def initialize(self):
@@ -46,13 +48,16 @@ class ChatbotService:
                 model_name=settings.EMBEDDING_MODEL
             )
 
-            # Ladda FAISS index
-            logger.info(f"Laddar FAISS index från: {settings.FAISS_INDEX_PATH}")
-            self.vectorstore = FAISS.load_local(
-                settings.FAISS_INDEX_PATH,
+            # Index laddas lazy per namn. Standardindexet laddas direkt så att
+            # ett felaktigt manifest upptäcks vid start.
+            self.indexes = IndexRouter(
+                settings.index_paths(),
                 self.embeddings,
-                allow_dangerous_deserialization=True
+                settings.EMBEDDING_MODEL,
+                settings.MAX_LOADED_INDEXES
             )
+            logger.info(f"Konfigurerade index: {', '.join(self.indexes.names())}")
+            self.indexes.get(settings.DEFAULT_INDEX)
 
             # Konfigurera Google Gemini API
             logger.info("Konfigurerar Google Gemini API...")
@@ -62,6 +67,14 @@ class ChatbotService:
 
             genai.configure(api_key=api_key)
 
+            # Kompilera prompt-mallen en gång. Det statiska prefixet skickas som
+            # system_instruction så att det är identiskt mellan requests och kan
+            # cachas av Gemini när det passerar leverantörens minsta cachestorlek.
+            # Med dagens prefix (~400 tokens) ligger det under gränsen, så inget
+            # cachas ännu.
+            self.prompt = PromptTemplate(settings.PROMPT_VERSION)
+            logger.info(f"Prompt-mall kompilerad: {self.prompt.version}")
+
             # Prova olika modeller i fallback-ordning
             models_to_try = [
                 'gemini-2.5-flash',
@@ -76,10 +89,14 @@ class ChatbotService:
             for model_name in models_to_try:
                 try:
                     logger.info(f"Försöker ladda modell: {model_name}")
-                    self.gemini_model = genai.GenerativeModel(model_name)
+                    self.gemini_model = genai.GenerativeModel(
+                        model_name,
+                        system_instruction=self.prompt.prefix
+                    )
                     # Testa att modellen fungerar med en enkel fråga
                     test_response = self.gemini_model.generate_content("Test")
                     logger.info(f"Modell {model_name} laddad!")
+                    self.prompt.count_prefix_tokens(model_name, genai)
                     model_loaded = True
                     break
                 except Exception as e:
@@ -154,28 +171,82 @@ class ChatbotService:
 
         return list(set(keywords))  # Ta bort dubbletter
 
-    def ask_question(self, query: str) -> str:
+    def _log_token_usage(self, response) -> None:
+        """
+        Logga statiska och dynamiska prompt-tokens för en request
+
+        "statiskt" är prefixets storlek, inte en besparing: cachat förväntas
+        vara 0 så länge prefixet är mindre än Geminis minsta cachestorlek.
+        """
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+
+        total = usage.prompt_token_count
+        static = self.prompt.prefix_tokens
+        cached = getattr(usage, "cached_content_token_count", 0) or 0
+        logger.info(
+            f"Prompt-tokens ({self.prompt.version}): totalt={total}, "
+            f"statiskt={static}, dynamiskt={max(total - static, 0)}, cachat={cached}"
+        )
+
+    def check_index(self, index_name: Optional[str] = None) -> None:
+        """Kasta IndexNotFound om indexet inte är konfigurerat (laddar inget)"""
+        self.indexes.check_name(index_name or settings.DEFAULT_INDEX)
+
+    def get_chunk(self, chunk_id: str, index_name: Optional[str] = None) -> Optional[Document]:
+        """
+        Hämta en chunk direkt via dess id (O(1) uppslag i docstore)
+
+        Används av "visa källa" i frontend utan att köra sökningen igen.
+        Laddar aldrig index från disk: kastar IndexNotLoaded om indexet
+        inte ligger i minnet, så att anropet är säkert från event loopen.
+        """
+        if not self.is_ready():
+            raise RuntimeError("Chatbot är inte initialiserad. Kör initialize() först.")
+
+        vectorstore = self.indexes.get_loaded(index_name or settings.DEFAULT_INDEX)
+        return vectorstore.docstore._dict.get(chunk_id)
+
+    @staticmethod
+    def _source(doc: Document, score: Optional[float]) -> dict:
+        """Bygg källhänvisning för ett dokument som användes i kontexten"""
+        return {
+            "chunk_id": doc.metadata.get("chunk_id"),
+            "index": doc.metadata.get("index"),
+            "model": doc.metadata.get("model"),
+            "page_start": doc.metadata.get("page_start"),
+            "page_end": doc.metadata.get("page_end"),
+            "score": score,
+        }
+
+    def ask_question(self, query: str, index_name: Optional[str] = None) -> Tuple[str, List[dict]]:
         """
         Ställ en fråga till chatboten
 
         Args:
             query: Användarens fråga
+            index_name: Vilket index (produktlinje) som ska sökas, standard om None
 
         Returns:
-            Chatbotens svar
+            Chatbotens svar och källorna (chunks) som användes som kontext
         """
         if not self.is_ready():
             raise RuntimeError("Chatbot är inte initialiserad. Kör initialize() först.")
 
         try:
+            vectorstore = self.indexes.get(index_name or settings.DEFAULT_INDEX)
+
             # Hämta relevanta dokument från FAISS (semantisk sökning)
-            docs = self.vectorstore.similarity_search(query, k=settings.NUM_DOCUMENTS)
+            scored_docs = vectorstore.similarity_search_with_score(query, k=settings.NUM_DOCUMENTS)
+            docs = [doc for doc, _ in scored_docs]
+            scores = {doc.metadata.get("chunk_id"): float(score) for doc, score in scored_docs}
 
             # Hybrid sökning: Lägg till nyckelordssökning för tekniska termer
             keywords = self._extract_keywords(query)
             keyword_docs = []
             if keywords:
-                all_docs = list(self.vectorstore.docstore._dict.values())
+                all_docs = list(vectorstore.docstore._dict.values())
                 for doc in all_docs:
                     content_lower = doc.page_content.lower()
                     # Räkna hur många nyckelord som matchar
@@ -198,52 +269,33 @@ class ChatbotService:
 
             # Bygg context från dokument
             context = ""
+            sources = []
             for doc in docs:
                 if len(context) + len(doc.page_content) < settings.MAX_CONTEXT_LENGTH:
-                    context += doc.page_content + "\n"
+                    context += doc.page_content + "\n\n"
+                    sources.append(self._source(doc, scores.get(doc.metadata.get("chunk_id"))))
                 else:
                     # Ta med en del av det sista dokumentet för att fylla ut
                     remaining_length = settings.MAX_CONTEXT_LENGTH - len(context)
                     if remaining_length > 0:
                         context += doc.page_content[:remaining_length]
+                        sources.append(self._source(doc, scores.get(doc.metadata.get("chunk_id"))))
                     break
 
-            # Rensa context
-            cleaned_context = context.replace('\n', ' ').strip()
-
-            # Skapa prompt för Gemini
-            prompt = f"""Du är en vänlig och kunnig expert på Husqvarna motorsågar. Du hjälper användare med deras frågor på ett avslappnat och naturligt sätt, som om du pratar med en kompis som behöver hjälp.
-
-Du har tillgång till information om FLERA Husqvarna-modeller:
-- Husqvarna 435 (bensindriven)
-- Husqvarna 542i XP (batteridriven)
+            # Rensa context. Radbrytningar behålls så att tabeller från
+            # chunkningen i chat_setup.py förblir läsbara för modellen.
+            cleaned_context = context.strip()
 
-REGLER FÖR DIN TON:
-- Var personlig och vänlig, men inte överdriven
-- Använd vardagligt språk, undvik stelt "kundtjänst-språk"
-- Ge konkreta och praktiska svar
-- Om du ger instruktioner, gör dem enkla att följa
-- Det är okej att vara lite entusiastisk om motorsågar!
-
-REGLER FÖR JÄMFÖRELSER:
-- Om användaren frågar om en specifik modell, fokusera på den
-- Om användaren vill jämföra, lyft fram skillnader tydligt
-- Ange alltid vilken modell informationen gäller
-- Kontexten är taggad med [MODELL: ...] för att visa vilken såg texten gäller
-
-KONTEXT FRÅN BRUKSANVISNINGAR:
-{cleaned_context}
-
-ANVÄNDARENS FRÅGA:
-{query}
-
-Svara på svenska. Om informationen inte finns i kontexten, var ärlig med det men försök ändå vara hjälpsam."""
+            # Bygg bara den dynamiska delen, prefixet ligger i system_instruction
+            prompt = self.prompt.render(context=cleaned_context, question=query)
 
             # Generera svar med Gemini
             response = self.gemini_model.generate_content(prompt)
             answer = response.text
 
-            return answer
+            self._log_token_usage(response)
+
+            return answer, sources
 
         except Exception as e:
             logger.error(f"Fel vid frågehantering: {e}")
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Index router - laddar namngivna FAISS-index lazy och håller de senast
+använda i minnet
+
+Varje index har en manifest.json (skrivs av scripts/chat_setup.py) med
+embedding-modell, dimension, chunkningsparametrar och byggtid. Manifestet
+valideras innan indexet läses in, så att tjänsten aldrig söker med vektorer
+från en annan embedding-modell och ett felaktigt index inte kostar minne.
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_community.vectorstores import FAISS
+from langchain_huggingface import HuggingFaceEmbeddings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+
+class IndexNotFound(Exception):
+    """Det efterfrågade indexet finns inte i konfigurationen"""
+
+
+class IndexNotLoaded(Exception):
+    """Indexet finns men ligger inte i minnet just nu"""
+
+
+def read_manifest(index_path: str) -> Optional[dict]:
+    """Läs manifest.json för ett index, None om det saknas"""
+    manifest_path = Path(index_path) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def validate_manifest(name: str, manifest: Optional[dict], embedding_model: str, dimension: int) -> None:
+    """
+    Kontrollera att indexet byggdes med samma embedding-modell som tjänsten använder
+
+    Körs innan indexet laddas. Index utan manifest (byggda före manifestet
+    fanns) accepteras med en varning och dimensionen kontrolleras efter
+    laddning istället, se IndexRouter._load.
+    """
+    if manifest is None:
+        logger.warning(f"Index '{name}' saknar {MANIFEST_FILE}, kan inte verifiera embedding-modell")
+        return
+
+    if manifest.get("embedding_model") != embedding_model:
+        raise ValueError(
+            f"Index '{name}' byggdes med {manifest.get('embedding_model')}, "
+            f"men tjänsten använder {embedding_model}. Bygg om indexet eller ändra EMBEDDING_MODEL."
+        )
+    if manifest.get("dimension") != dimension:
+        raise ValueError(
+            f"Index '{name}' har dimension {manifest.get('dimension')} i manifestet, "
+            f"men {embedding_model} ger {dimension}."
+        )
+
+    logger.info(
+        f"Index '{name}' validerat: {manifest.get('num_chunks')} chunks, "
+        f"byggt {manifest.get('built_at')}, chunkning {manifest.get('chunking')}"
+    )
+
+
+class IndexRouter:
+    """
+    Håller upp till max_loaded index i minnet och kastar det minst
+    nyligen använda när ett nytt behöver laddas
+    """
+
+    def __init__(self, index_paths: Dict[str, str], embeddings: HuggingFaceEmbeddings,
+                 embedding_model: str, max_loaded: int):
+        self.index_paths = index_paths
+        self.embeddings = embeddings
+        self.embedding_model = embedding_model
+        # Mät dimensionen via det publika API:et; attributet för den underliggande
+        # SentenceTransformer-modellen har bytt namn mellan versioner
+        self.dimension = len(embeddings.embed_query("dimension"))
+        self.max_loaded = max(max_loaded, 1)
+        self._loaded: "OrderedDict[str, FAISS]" = OrderedDict()
+        # ask_question körs i en trådpool. _lock skyddar bara LRU-dicten och
+        # hålls kort; själva laddningen låses per index så att requests mot
+        # index som redan ligger i minnet inte väntar på en kall laddning.
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def names(self) -> List[str]:
+        """Namn på alla konfigurerade index"""
+        return list(self.index_paths)
+
+    def loaded(self) -> List[str]:
+        """Namn på index som ligger i minnet, senast använt sist"""
+        return list(self._loaded)
+
+    def check_name(self, name: str) -> None:
+        """Kasta IndexNotFound om indexet inte är konfigurerat"""
+        if name not in self.index_paths:
+            raise IndexNotFound(f"Index '{name}' finns inte. Tillgängliga: {', '.join(self.names())}")
+
+    def _resident(self, name: str) -> Optional[FAISS]:
+        """Indexet om det ligger i minnet (markeras som senast använt), annars None"""
+        with self._lock:
+            vectorstore = self._loaded.get(name)
+            if vectorstore is not None:
+                self._loaded.move_to_end(name)
+            return vectorstore
+
+    def get_loaded(self, name: str) -> FAISS:
+        """
+        Hämta ett index som redan ligger i minnet, utan att ladda från disk
+
+        Kastar IndexNotLoaded om det inte är laddat. Säkert att anropa från
+        event loopen eftersom det aldrig väntar på en laddning.
+        """
+        self.check_name(name)
+        vectorstore = self._resident(name)
+        if vectorstore is None:
+            raise IndexNotLoaded(f"Index '{name}' är inte laddat just nu")
+        return vectorstore
+
+    def get(self, name: str) -> FAISS:
+        """Hämta ett index, ladda det från disk vid behov"""
+        self.check_name(name)
+
+        vectorstore = self._resident(name)
+        if vectorstore is not None:
+            return vectorstore
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            # En annan tråd kan ha laddat indexet medan vi väntade
+            vectorstore = self._resident(name)
+            if vectorstore is not None:
+                return vectorstore
+
+            vectorstore = self._load(name)
+            with self._lock:
+                self._loaded[name] = vectorstore
+                while len(self._loaded) > self.max_loaded:
+                    evicted, _ = self._loaded.popitem(last=False)
+                    logger.info(f"Kastade index '{evicted}' från minnet (LRU)")
+            return vectorstore
+
+    def _load(self, name: str) -> FAISS:
+        """Validera manifestet och ladda ett index från disk"""
+        path = self.index_paths[name]
+        validate_manifest(name, read_manifest(path), self.embedding_model, self.dimension)
+
+        logger.info(f"Laddar FAISS index '{name}' från: {path}")
+        vectorstore = FAISS.load_local(
+            path,
+            self.embeddings,
+            allow_dangerous_deserialization=True
+        )
+        if vectorstore.index.d != self.dimension:
+            raise ValueError(
+                f"Index '{name}' har dimension {vectorstore.index.d}, "
+                f"men {self.embedding_model} ger {self.dimension}. Bygg om indexet."
+            )
+
+        # Docstore är en dict nycklad på chunk-id. Spegla id:t i metadata så
+        # att källor kan anges även för dokument från nyckelordssökningen.
+        for chunk_id, doc in vectorstore.docstore._dict.items():
+            doc.metadata["chunk_id"] = chunk_id
+            doc.metadata["index"] = name
+
+        return vectorstore
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Versionerade prompt-mallar för chatboten
+
+Prompten delas i två delar:
+- Ett statiskt prefix (persona och regler) som är identiskt för alla requests,
+  så att generationsbackenden kan cacha det (t.ex. Gemini context caching
+  eller KV-cache för en lokal modell) när det är tillräckligt stort. Dagens
+  prefix ligger under Geminis minsta cachestorlek och cachas inte.
+- En dynamisk del med kontext och fråga som byggs per request.
+"""
+import logging
+from string import Template
+
+logger = logging.getLogger(__name__)
+
+# --- Mallar, nycklade på version ---
+# Ändra aldrig en befintlig version, lägg till en ny istället så att
+# cachade prefix och token-statistik går att jämföra mellan versioner.
+PROMPT_TEMPLATES = {
+    "v1": {
+        "prefix": """Du är en vänlig och kunnig expert på Husqvarna motorsågar. Du hjälper användare med deras frågor på ett avslappnat och naturligt sätt, som om du pratar med en kompis som behöver hjälp.
+
+Du har tillgång till information om FLERA Husqvarna-modeller:
+- Husqvarna 435 (bensindriven)
+- Husqvarna 542i XP (batteridriven)
+
+REGLER FÖR DIN TON:
+- Var personlig och vänlig, men inte överdriven
+- Använd vardagligt språk, undvik stelt "kundtjänst-språk"
+- Ge konkreta och praktiska svar
+- Om du ger instruktioner, gör dem enkla att följa
+- Det är okej att vara lite entusiastisk om motorsågar!
+
+REGLER FÖR JÄMFÖRELSER:
+- Om användaren frågar om en specifik modell, fokusera på den
+- Om användaren vill jämföra, lyft fram skillnader tydligt
+- Ange alltid vilken modell informationen gäller
+- Kontexten är taggad med [MODELL: ...] för att visa vilken såg texten gäller
+
+Svara på svenska. Om informationen inte finns i kontexten, var ärlig med det men försök ändå vara hjälpsam.""",
+        "dynamic": """KONTEXT FRÅN BRUKSANVISNINGAR:
+$context
+
+ANVÄNDARENS FRÅGA:
+$question""",
+    },
+}
+
+
+class PromptTemplate:
+    """
+    En kompilerad prompt-mall med statiskt prefix och dynamisk del
+    """
+
+    def __init__(self, version: str):
+        if version not in PROMPT_TEMPLATES:
+            raise ValueError(
+                f"Okänd prompt-version: {version}. "
+                f"Tillgängliga: {', '.join(sorted(PROMPT_TEMPLATES))}"
+            )
+
+        template = PROMPT_TEMPLATES[version]
+        self.version = version
+        self.prefix: str = template["prefix"]
+        self._dynamic = Template(template["dynamic"])
+        self.prefix_tokens: int = 0
+
+    def render(self, context: str, question: str) -> str:
+        """
+        Bygg den dynamiska delen av prompten
+
+        Args:
+            context: Rensad kontext från bruksanvisningarna
+            question: Användarens fråga
+
+        Returns:
+            Prompt-text som skickas efter det cachade prefixet
+        """
+        return self._dynamic.substitute(context=context, question=question)
+
+    def count_prefix_tokens(self, model_name: str, genai) -> int:
+        """
+        Räkna tokens i det statiska prefixet en gång vid start
+
+        Faller tillbaka på en grov uppskattning (~4 tecken per token)
+        om API:et inte kan nås.
+        """
+        try:
+            counter = genai.GenerativeModel(model_name)
+            self.prefix_tokens = counter.count_tokens(self.prefix).total_tokens
+        except Exception as e:
+            logger.warning(f"Kunde inte räkna prefix-tokens: {e}")
+            self.prefix_tokens = len(self.prefix) // 4
+
+        logger.info(f"Prompt {self.version}: statiskt prefix = {self.prefix_tokens} tokens")
+        return self.prefix_tokens
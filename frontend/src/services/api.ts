@@ -2,7 +2,7 @@
  * API service för att kommunicera med backend
  */
 import axios from 'axios';
-import type { ChatRequest, ChatResponse, HealthResponse } from '../types/chat';
+import type { ChatRequest, ChatResponse, ChunkResponse, HealthResponse } from '../types/chat';
 
 // I Docker används relativ URL (nginx proxar till backend), lokalt används localhost:8000
 const API_BASE_URL = import.meta.env.VITE_API_URL ?? '';
@@ -21,7 +21,10 @@ const apiClient = axios.create({
  * Kontrollera om API:et är igång och redo
  */
 export const checkHealth = async (): Promise<HealthResponse> => {
-  const response = await apiClient.get<HealthResponse>('/health/');
+  // 503 betyder att servern är tillfälligt överbelastad, bodyn är fortfarande giltig
+  const response = await apiClient.get<HealthResponse>('/health/', {
+    validateStatus: (code) => code === 200 || code === 503,
+  });
   return response.data;
 };
 
@@ -41,7 +44,18 @@ export const sendChatMessage = async (
   return response.data;
 };
 
+/**
+ * Hämta källtexten för en chunk från ett chat-svar
+ */
+export const getChunk = async (chunkId: string, index?: string): Promise<ChunkResponse> => {
+  const response = await apiClient.get<ChunkResponse>(`/chunks/${encodeURIComponent(chunkId)}`, {
+    params: { index },
+  });
+  return response.data;
+};
+
 export default {
   checkHealth,
   sendChatMessage,
+  getChunk,
 };
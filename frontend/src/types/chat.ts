@@ -13,17 +13,43 @@ export interface ChatMessage {
 export interface ChatRequest {
   question: string;
   session_id?: string;
+  index?: string;
+}
+
+// Optional-fält i backend skickas alltid, men kan vara null
+export interface SourceChunk {
+  chunk_id: string;
+  index: string | null;
+  model: string | null;
+  page_start: number | null;
+  page_end: number | null;
+  score: number | null;
 }
 
 export interface ChatResponse {
   answer: string;
   question: string;
-  session_id?: string;
+  session_id: string | null;
+  sources: SourceChunk[];
   timestamp: string;
 }
 
+export interface ChunkResponse {
+  chunk_id: string;
+  index: string;
+  content: string;
+  model: string | null;
+  section: string | null;
+  page_start: number | null;
+  page_end: number | null;
+}
+
 export interface HealthResponse {
   status: string;
   version: string;
   model_loaded: boolean;
+  queue_depth: number;
+  active_generations: number;
+  max_queue_size: number;
+  loaded_indexes: string[];
 }
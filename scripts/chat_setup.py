@@ -1,14 +1,37 @@
+"""
+Bygg ett FAISS-index från PDF-manualer
+
+Användning:
+  python scripts/chat_setup.py                          # standardindexet (motorsågarna)
+  python scripts/chat_setup.py --index trimmers --pdfs data/trimmers.json
+  python scripts/chat_setup.py --output faiss_index/sagar
+
+--pdfs pekar på en JSON-lista i samma format som PDF_CONFIGS nedan.
+Utan --output skrivs indexet till sökvägen för --index i FAISS_INDEXES
+(eller FAISS_INDEX_PATH för standardindexet).
+"""
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
+from sentence_transformers import SentenceTransformer
 from pypdf import PdfReader
 from dotenv import load_dotenv
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse
+import json
 import os
+import re
+import sys
 
 load_dotenv()
 
-# --- Konfigurera vilka PDF:er som ska läsas in ---
+# Embedding-modell och indexsökvägar läses från backendens Settings så att
+# skriptet och tjänsten aldrig kan glida isär
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from backend.app.core.config import settings
+
+# --- Standard-PDF:er (används om --pdfs inte anges) ---
 PDF_CONFIGS = [
     {
         "file": "data/husqvarna435.pdf",
@@ -24,14 +47,35 @@ PDF_CONFIGS = [
     },
 ]
 
+# --- Chunkning ---
+# Storleken mäts i embedding-modellens tokens, inte i tecken. Modellen trunkerar
+# allt över max_seq_length, så större chunks ger bara text som aldrig embeddas.
+EMBEDDING_MODEL = settings.EMBEDDING_MODEL
+CHUNK_OVERLAP_TOKENS = 32  # Överlapp mellan textchunks inom samma sektion
+
+# Rubriker: "3 Underhåll", "3.2 Byta kedja" eller korta rader i versaler
+HEADING_PATTERN = re.compile(r"^(\d+(\.\d+)*\s+[A-ZÅÄÖ][^.!?:]{0,60}|(?=.*[A-ZÅÄÖ]{3})[A-ZÅÄÖ0-9 ,&/-]{4,60})$")
+# Tabellrader: kolumner separerade med flera mellanslag eller tabb
+TABLE_ROW_PATTERN = re.compile(r"\S+(\s{2,}|\t)\S+")
+# Sidnummer i sidhuvud/sidfot, ignoreras så att tabeller kan fortsätta över sidbrytningen
+PAGE_NUMBER_PATTERN = re.compile(r"^\d{1,4}$")
+# Specrader utan kolumnavstånd, t.ex. "Vikt, kg 4,4" eller "Ljudnivå dB(A) 103".
+# Kräver både ett värde sist och en enhet, annars räknas "Husqvarna 435" som tabell.
+SPEC_VALUE_PATTERN = re.compile(r"^\d+([,.]\d+)?$")
+SPEC_UNIT_PATTERN = re.compile(
+    r"(^|[\s,(])(kg|g|kw|w|hk|cm3|cm³|cm|mm|m|l|liter|ml|db\(a\)|db|m/s2|m/s²|r/min|rpm|v|ah|wh|tum|°c|%)([\s,)]|$)",
+    re.IGNORECASE
+)
+
+
 def read_pdf(config):
-    """Läs in en PDF och returnera text med modelltagg"""
+    """Läs in en PDF och returnera en lista med (sidnummer, text)"""
     pdf_file = config["file"]
     model_name = config["model"]
 
     if not os.path.exists(pdf_file):
         print(f"VARNING: {pdf_file} finns inte, hoppar över...")
-        return ""
+        return []
 
     reader = PdfReader(pdf_file)
 
@@ -44,44 +88,354 @@ def read_pdf(config):
     print(f"Totalt antal sidor i PDF: {len(reader.pages)}")
     print(f"Läser sidor: {start_idx + 1} till {end_idx}")
 
-    text = ""
+    # Behåll radbrytningar, de behövs för att hitta rubriker och tabeller
+    pages = []
     for i in range(start_idx, min(end_idx, len(reader.pages))):
-        page = reader.pages[i]
-        page_text = page.extract_text()
-        page_text = page_text.replace("\n", " ").strip()
-        text += page_text + "\n"
+        page_text = reader.pages[i].extract_text() or ""
+        pages.append((i + 1, page_text))
 
-    # Lägg till modelltagg i början av texten så AI:n vet vilken såg det gäller
-    tagged_text = f"[MODELL: {model_name}]\n{text}"
+    print(f"Antal tecken extraherade: {sum(len(t) for _, t in pages)}")
+    return pages
 
-    print(f"Antal tecken extraherade: {len(text)}")
-    return tagged_text
 
-# --- Läs in alla PDF:er ---
-all_text = ""
-for config in PDF_CONFIGS:
-    all_text += read_pdf(config) + "\n\n"
+def is_heading(line):
+    """Kontrollera om en rad ser ut som en sektionsrubrik"""
+    return len(line) <= 80 and bool(HEADING_PATTERN.match(line)) and not is_table_row(line)
 
-print(f"\n--- Totalt ---")
-print(f"Totalt antal tecken från alla PDF:er: {len(all_text)}")
 
-# --- Skapa Document-objekt ---
-docs = [Document(page_content=all_text)]
+def is_table_row(line):
+    """
+    Kontrollera om en rad ser ut som en rad i en spec- eller felsökningstabell
+
+    En enskild rad räcker inte för att bli en tabell, se split_blocks.
+    """
+    if TABLE_ROW_PATTERN.search(line.strip()):
+        return True
+    words = line.split()
+    if not 2 <= len(words) <= 8 or not SPEC_VALUE_PATTERN.match(words[-1]):
+        return False
+    return bool(SPEC_UNIT_PATTERN.search(" ".join(words[:-1])))
+
+
+def split_blocks(pages):
+    """
+    Dela sidor i block: rubriker, stycken och tabeller
+
+    Returnerar en lista med dicts (type, text, page_start, page_end, section).
+    Tabeller (minst två sammanhängande tabellrader) blir ett block så att de
+    hålls ihop, även när de fortsätter på nästa sida. En ensam tabellrad
+    behandlas som vanlig text. Stycken avslutas alltid vid sidbrytning.
+    """
+    # Klassificera alla rader först, över sidgränserna, så att ensamma
+    # tabellrader kan degraderas till text innan blocken byggs
+    lines = []
+    for page_number, page_text in pages:
+        for raw_line in page_text.splitlines():
+            line = raw_line.rstrip()
+            stripped = line.strip()
+            if not stripped or PAGE_NUMBER_PATTERN.match(stripped):
+                kind = "blank"
+            elif is_heading(stripped):
+                kind = "heading"
+            elif is_table_row(line):
+                kind = "table"
+            else:
+                kind = "text"
+            lines.append((kind, line, page_number))
+
+    non_blank = [i for i, (kind, _, _) in enumerate(lines) if kind != "blank"]
+    for pos, i in enumerate(non_blank):
+        if lines[i][0] != "table":
+            continue
+        neighbours = [non_blank[p] for p in (pos - 1, pos + 1) if 0 <= p < len(non_blank)]
+        if not any(lines[n][0] == "table" for n in neighbours):
+            lines[i] = ("text",) + lines[i][1:]
+
+    blocks = []
+    section = ""
+    current = []
+    current_type = None
+    pages_in_block = []
+
+    def flush():
+        if current:
+            blocks.append({
+                "type": current_type,
+                "text": "\n".join(current),
+                "page_start": pages_in_block[0],
+                "page_end": pages_in_block[-1],
+                "section": section,
+            })
+            current.clear()
+            pages_in_block.clear()
+
+    for kind, line, page_number in lines:
+        stripped = line.strip()
+
+        # Sidbrytning avslutar stycken så att sidnumret stämmer. En öppen
+        # tabell hålls kvar; den avslutas av första rad som inte är tabell.
+        if pages_in_block and page_number != pages_in_block[-1] and current_type == "text":
+            flush()
+
+        if kind == "blank":
+            # Tomrad avslutar stycken, men inte tabeller
+            if current_type == "text":
+                flush()
+            continue
+
+        if kind == "heading":
+            flush()
+            section = stripped
+            current_type = None
+            continue
+
+        if kind != current_type:
+            flush()
+            current_type = kind
+        current.append(stripped if kind == "text" else line)
+        pages_in_block.append(page_number)
+
+    flush()
+    return blocks
+
+
+def count_tokens(text, tokenizer):
+    """Räkna tokens med embedding-modellens tokenizer"""
+    return len(tokenizer.tokenize(text))
+
+
+def split_tokens(text, budget, tokenizer):
+    """
+    Sista utväg: dela text i fönster om högst budget tokens
+
+    Används för delar som saknar naturliga brytpunkter (punktlistor utan
+    skiljetecken, mycket långa tabellrader) så att inget trunkeras tyst.
+    Fönstren klipps ur originaltexten via tokenizerns offsets, så att
+    texten inte återskapas från tokens (och tappar tecken).
+    """
+    if count_tokens(text, tokenizer) <= budget:
+        return [text]
+
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+    overlap = min(CHUNK_OVERLAP_TOKENS, budget // 4)
+    parts = []
+    start = 0
+    while start < len(offsets):
+        end = min(start + budget, len(offsets))
+        piece = text[offsets[start][0]:offsets[end - 1][1]].strip()
+        # Gränserna kan tokeniseras lite annorlunda i en utklippt bit
+        while end - start > 1 and count_tokens(piece, tokenizer) > budget:
+            end -= 1
+            piece = text[offsets[start][0]:offsets[end - 1][1]].strip()
+        parts.append(piece)
+        if end >= len(offsets):
+            break
+        start = max(end - overlap, start + 1)
+    return parts
+
+
+def split_table(text, budget, tokenizer):
+    """Dela en för stor tabell radvis och upprepa första raden (rubrikraden)"""
+    rows = text.split("\n")
+    header, body = rows[0], rows[1:]
+    parts, current = [], [header]
+
+    for row in body:
+        if count_tokens("\n".join(current + [row]), tokenizer) > budget and len(current) > 1:
+            parts.append("\n".join(current))
+            current = [header]
+        current.append(row)
+    parts.append("\n".join(current))
 
-# --- Dela upp i chunks ---
-# Större chunks för att behålla mer kontext (t.ex. hela felsökningstabeller)
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=300)
-docs_split = text_splitter.split_documents(docs)
+    # En enskild rad kan fortfarande vara för stor
+    return [piece for part in parts for piece in split_tokens(part, budget, tokenizer)]
+
+
+def split_text(text, budget, tokenizer):
+    """Dela ett för stort stycke på meningar med visst överlapp"""
+    # Meningar som fortfarande är för stora delas på rader (punktlistor)
+    # och till sist i token-fönster
+    sentences = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        if count_tokens(sentence, tokenizer) <= budget:
+            sentences.append(sentence)
+            continue
+        for line in sentence.split("\n"):
+            sentences.extend(split_tokens(line, budget, tokenizer))
+
+    parts, current = [], []
+
+    for sentence in sentences:
+        if current and count_tokens(" ".join(current + [sentence]), tokenizer) > budget:
+            parts.append(" ".join(current))
+            # Behåll sista meningarna som överlapp, om de ryms
+            overlap = []
+            while current and count_tokens(" ".join([current[-1]] + overlap), tokenizer) <= CHUNK_OVERLAP_TOKENS:
+                overlap.insert(0, current.pop())
+            if count_tokens(" ".join(overlap + [sentence]), tokenizer) > budget:
+                overlap = []
+            current = overlap
+        current.append(sentence)
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def chunk_blocks(blocks, config, tokenizer, max_tokens):
+    """
+    Slå ihop block till chunks inom sektions- och token-gränser
+
+    Varje chunk börjar med modelltaggen så att AI:n vet vilken såg den gäller,
+    och sidintervallet sparas i metadata för källhänvisningar.
+    """
+    tag = f"[MODELL: {config['model']}]"
+    chunks = []
+    current = []
+
+    def header(section):
+        return f"{tag} {section}".strip()
+
+    def emit():
+        if not current:
+            return
+        text = header(current[0]["section"]) + "\n" + "\n\n".join(b["text"] for b in current)
+        chunks.append(Document(
+            page_content=text,
+            metadata={
+                "model": config["model"],
+                "source": config["file"],
+                "section": current[0]["section"],
+                "page_start": min(b["page_start"] for b in current),
+                "page_end": max(b["page_end"] for b in current),
+                "chunk_type": "table" if any(b["type"] == "table" for b in current) else "text",
+            },
+        ))
+        current.clear()
+
+    # tokenize() räknar inte <s>/</s>, men de ryms inom max_seq_length
+    special_tokens = tokenizer.num_special_tokens_to_add()
+
+    for block in blocks:
+        budget = max_tokens - special_tokens - count_tokens(header(block["section"]), tokenizer) - 1
+
+        # Dela block som inte ryms i en chunk på egen hand
+        if count_tokens(block["text"], tokenizer) > budget:
+            emit()
+            if block["type"] == "table":
+                parts = split_table(block["text"], budget, tokenizer)
+            else:
+                parts = split_text(block["text"], budget, tokenizer)
+            for part in parts:
+                current.append({**block, "text": part})
+                emit()
+            continue
+
+        # Ny sektion eller full chunk avslutar nuvarande chunk
+        if current and (
+            block["section"] != current[0]["section"]
+            or count_tokens("\n\n".join([b["text"] for b in current] + [block["text"]]), tokenizer) > budget
+        ):
+            emit()
+        current.append(block)
+
+    emit()
+    return chunks
+
+
+def load_pdf_configs(path):
+    """Läs en JSON-lista med PDF-konfigurationer, med samma nycklar som PDF_CONFIGS"""
+    with open(path, encoding="utf-8") as f:
+        configs = json.load(f)
+    for config in configs:
+        if "file" not in config or "model" not in config:
+            raise ValueError(f"{path}: varje PDF behöver 'file' och 'model'")
+        config.setdefault("start_page", 1)
+        config.setdefault("end_page", None)
+    return configs
+
+
+# --- Argument ---
+parser = argparse.ArgumentParser(description="Bygg ett FAISS-index från PDF-manualer")
+parser.add_argument("--index", default=settings.DEFAULT_INDEX,
+                    help=f"Indexnamn (standard: {settings.DEFAULT_INDEX})")
+parser.add_argument("--output", help="Katalog att spara indexet i (standard: sökvägen för --index)")
+parser.add_argument("--pdfs", help="JSON-fil med PDF-konfigurationer (standard: motorsågarna)")
+args = parser.parse_args()
+
+index_path = args.output or settings.index_paths().get(args.index)
+if not index_path:
+    parser.error(f"Index '{args.index}' finns inte i FAISS_INDEXES, ange --output")
+pdf_configs = load_pdf_configs(args.pdfs) if args.pdfs else PDF_CONFIGS
+
+print(f"Index: {args.index} -> {index_path}")
+print(f"Embedding-modell: {EMBEDDING_MODEL}")
+
+# --- Ladda embedding-modell (lokalt HuggingFace, gratis) ---
+print("\nLaddar embedding-modell...")
+# Tokenizer och max_seq_length hämtas från SentenceTransformer direkt, eftersom
+# HuggingFaceEmbeddings inte exponerar klienten publikt i alla versioner
+sentence_model = SentenceTransformer(EMBEDDING_MODEL)
+tokenizer = sentence_model.tokenizer
+max_tokens = sentence_model.max_seq_length
+embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+print(f"Max chunkstorlek: {max_tokens} tokens")
+
+# --- Läs in alla PDF:er och dela upp i chunks ---
+docs_split = []
+ids = []
+chunk_counters = {}
+for config in pdf_configs:
+    pages = read_pdf(config)
+    blocks = split_blocks(pages)
+    chunks = chunk_blocks(blocks, config, tokenizer, max_tokens)
+
+    # Stabila id:n (t.ex. "husqvarna-435-0012") används för källhänvisningar.
+    # Räknaren delas per modell över hela bygget, så flera PDF:er för samma
+    # modell (t.ex. en manual uppdelad i filer) inte ger dubbla id:n.
+    slug = re.sub(r"[^a-z0-9]+", "-", config["model"].lower()).strip("-")
+    for chunk in chunks:
+        n = chunk_counters.get(slug, 0)
+        chunk_counters[slug] = n + 1
+        chunk.metadata["chunk_id"] = f"{slug}-{n:04d}"
+        ids.append(chunk.metadata["chunk_id"])
+
+    tables = sum(1 for c in chunks if c.metadata["chunk_type"] == "table")
+    print(f"{config['model']}: {len(blocks)} block -> {len(chunks)} chunks ({tables} med tabeller)")
+    docs_split.extend(chunks)
+
+print(f"\n--- Totalt ---")
 print(f"Antal chunks: {len(docs_split)}")
+if not docs_split:
+    sys.exit("Inga chunks skapades, kontrollera PDF-konfigurationen")
 
-# --- Skapa embeddings (lokalt HuggingFace, gratis) ---
+# --- Skapa embeddings och FAISS-index ---
 print("\nSkapar embeddings med HuggingFace...")
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/paraphrase-multilingual-mpnet-base-v2")
-
-# --- Skapa FAISS-index ---
-vectorstore = FAISS.from_documents(docs_split, embeddings)
+vectorstore = FAISS.from_documents(docs_split, embeddings, ids=ids)
 
 # --- Spara index lokalt ---
-vectorstore.save_local("faiss_index")
-print("FAISS-index sparat som 'faiss_index'")
-print("\nKlart! Du kan nu ställa frågor om båda sågarna.")
+vectorstore.save_local(index_path)
+print(f"FAISS-index sparat i '{index_path}'")
+
+# --- Skriv manifest ---
+# Backend validerar manifestet vid laddning, så att ett index aldrig söks med
+# en annan embedding-modell än den som byggde det.
+manifest = {
+    "index": args.index,
+    "embedding_model": EMBEDDING_MODEL,
+    "dimension": vectorstore.index.d,
+    "chunking": {
+        "strategy": "section-aware",
+        "max_tokens": max_tokens,
+        "overlap_tokens": CHUNK_OVERLAP_TOKENS,
+    },
+    "sources": [
+        {"file": c["file"], "model": c["model"], "start_page": c["start_page"], "end_page": c["end_page"]}
+        for c in pdf_configs
+    ],
+    "num_chunks": len(docs_split),
+    "built_at": datetime.now(timezone.utc).isoformat(),
+}
+with open(os.path.join(index_path, "manifest.json"), "w", encoding="utf-8") as f:
+    json.dump(manifest, f, ensure_ascii=False, indent=2)
+print(f"Manifest sparat: {EMBEDDING_MODEL}, dimension {manifest['dimension']}")
+print(f"\nKlart! Du kan nu ställa frågor mot indexet '{args.index}'.")